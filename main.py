@@ -7,60 +7,107 @@ Usage:
 
 Optional:
   uv run python main.py --env .env --cookie cookie.json --url <practice_url> --output output --txt --raw
+
+Compare two exported banks:
+  uv run python main.py diff output_old/questions.json output/questions.json [--format json]
+
+Run as a local export service (HTTP job queue):
+  uv run python main.py serve [--port 8765] [--workers 2]
 """
 
 from __future__ import annotations
 
 import argparse
+import json
 import sys
 
+from python.cassette import Cassette
 from python.config import Config
 from python.client import ULearningClient
-from python.exporter import Exporter
-from python.formatter import QuestionFormatter
+from python.deadline import Deadline
+from python.hedging import HedgePolicy
+from python.tracing import Tracer
+from python.differ import diff_banks, load_bank
+from python.pipeline import ExportOptions, export_bank
+from python.planner import plan_export
+from python.probe import resolve_base_url
+
+
+def _positive_int(value: str) -> int:
+    try:
+        n = int(value)
+    except ValueError:
+        n = 0
+    if n <= 0:
+        raise argparse.ArgumentTypeError(f"must be a positive integer: {value}")
+    return n
 
 
 def run(
-    env_path: str,
-    cookie_file: str | None,
-    practice_url: str | None,
-    output_dir: str | None,
-    use_user_answers: bool,
-    correct_limit: int | None,
-    export_raw: bool,
-    export_txt: bool,
+    options: ExportOptions,
+    *,
+    env_path: str = ".env",
+    cookie_file: str | None = None,
+    practice_url: str | None = None,
+    output_dir: str | None = None,
+    record_path: str | None = None,
+    replay_path: str | None = None,
+    replay_timing: bool = False,
+    connect_timeout: float = ULearningClient.DEFAULT_TIMEOUT[0],
+    read_timeout: float = ULearningClient.DEFAULT_TIMEOUT[1],
+    deadline_seconds: float | None = None,
+    trace_path: str | None = None,
+    hedge: bool = False,
+    hedge_percentile: float = 95.0,
+    hedge_budget: float = 0.1,
+    plan_only: bool = False,
+    probe: bool = True,
+    reprobe: bool = False,
 ) -> int:
+    cassette: Cassette | None = None
+    tracer = Tracer(enabled=bool(trace_path))
+    hedging: HedgePolicy | None = None
     try:
+        options.validate()
+        if hedge:
+            hedging = HedgePolicy(percentile=hedge_percentile, budget=hedge_budget)
         config = Config.load(env_file=env_path, cookie_file=cookie_file, practice_url=practice_url)
         if output_dir:
             config.output_dir = output_dir
+        # Without an explicit BASE_URL, ask every known deployment once (in parallel) and keep the fastest.
+        if probe and not replay_path and not config.base_url_explicit:
+            config.base_url = resolve_base_url(config, practice_url, refresh=reprobe)
 
-        client = ULearningClient(config)
-
-        # Default: export standard answers (correctAnswer) by calling submit_answer.
-        # Legacy mode (--user-answer): export user's submitted answers (answerSheet.answer) without submitting.
-        raw_questions = client.fetch_all_questions(include_user_answers=use_user_answers)
+        if replay_path:
+            cassette = Cassette(replay_path, mode="replay", realtime=replay_timing)
+        elif record_path:
+            cassette = Cassette(record_path, mode="record")
 
-        if not use_user_answers:
-            # Collect standard answers by auto-submitting dummy answers.
-            # NOTE: this will write answer records to the training.
-            correct_map = client.fetch_correct_answers(limit=correct_limit)
-            for q in raw_questions:
-                qid = q.get("id")
-                if isinstance(qid, int) and qid in correct_map:
-                    q["userAnswer"] = correct_map[qid]
-
-        formatted_questions = QuestionFormatter.format_all(raw_questions)
+        deadline = Deadline(deadline_seconds)
+        client = ULearningClient(
+            config,
+            cassette=cassette,
+            timeout=(connect_timeout, read_timeout),
+            deadline=deadline,
+            tracer=tracer,
+            hedging=hedging,
+        )
 
-        exporter = Exporter(config.output_dir)
-        exporter.export_json(formatted_questions)
+        # Replaying without original timing: skip pacing sleeps, nothing hits the server.
+        if cassette is not None and cassette.replaying and not replay_timing:
+            options.fetch_delay = options.answer_delay = 0
 
-        if export_raw:
-            exporter.export_raw_json(raw_questions)
+        if plan_only:
+            # Dry run: one answerSheet request, nothing is submitted or written.
+            print(plan_export(client, options, deadline=deadline_seconds).to_text(), end="")
+            return 0
 
-        if export_txt:
-            exporter.export_txt(formatted_questions)
+        result = export_bank(client, options)
 
+        if result.incomplete:
+            # Everything collected so far has been written; signal the partial result to schedulers.
+            print("Warning: Deadline reached, export is incomplete", file=sys.stderr)
+            return 2
         return 0
     except ValueError as e:
         print(f"Configuration error: {e}", file=sys.stderr)
@@ -68,9 +115,90 @@ def run(
     except Exception as e:
         print(f"Error: {e}", file=sys.stderr)
         return 1
+    finally:
+        # Keep whatever was recorded, even for failed runs: those are the ones worth replaying.
+        if cassette is not None and cassette.recording:
+            cassette.save()
+        if trace_path:
+            tracer.save(trace_path)
+        if hedging is not None:
+            stats = hedging.stats()
+            print(f"Hedging: {stats['hedges']} hedges for {stats['calls']} GETs, {stats['hedge_wins']} won by the hedge")
+            hedging.close()
+
+
+def run_diff(old_path: str, new_path: str, output_format: str, output_file: str | None) -> int:
+    try:
+        result = diff_banks(load_bank(old_path), load_bank(new_path))
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    if output_format == "json":
+        text = json.dumps(result.to_dict(), ensure_ascii=False, indent=2) + "\n"
+    else:
+        text = result.to_text()
+
+    if output_file:
+        with open(output_file, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text)
+    return 0
+
+
+def diff_main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="main.py diff",
+        description="Compare two exported question banks (questions.json or questions_raw.json)",
+    )
+    parser.add_argument("old", help="Previous export")
+    parser.add_argument("new", help="Current export")
+    parser.add_argument("--format", choices=["text", "json"], default="text", help="Output format")
+    parser.add_argument("--output", default=None, help="Write the report to a file instead of stdout")
+
+    args = parser.parse_args(argv)
+    raise SystemExit(run_diff(args.old, args.new, args.format, args.output))
+
+
+def serve_main(argv: list[str]) -> None:
+    # Imported lazily: only the service needs http.server and the job machinery.
+    from python.server import ExportService, serve
+
+    parser = argparse.ArgumentParser(
+        prog="main.py serve",
+        description="Run a local export service: POST /jobs, GET /jobs/<id>, GET /jobs/<id>/files/<name>",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address (default: %(default)s)")
+    parser.add_argument("--port", type=int, default=8765, help="Port (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=2, help="Concurrent export jobs (default: %(default)s)")
+    parser.add_argument("--env", default=".env", help="Path to .env file shared by all jobs")
+    parser.add_argument("--output-root", default="output/jobs", help="Jobs write to <output-root>/<job id>/")
+    parser.add_argument(
+        "--credentials-dir",
+        default=".",
+        help="Directory holding cookie files; jobs reference them by name (default: current directory).",
+    )
+    parser.add_argument("--assets-dir", default=None, help="Shared asset store for jobs with fetch_images")
+
+    args = parser.parse_args(argv)
+    service = ExportService(
+        output_root=args.output_root,
+        credentials_dir=args.credentials_dir,
+        env_file=args.env,
+        max_workers=args.workers,
+        assets_dir=args.assets_dir,
+    )
+    serve(service, host=args.host, port=args.port)
+    raise SystemExit(0)
 
 
 def main() -> None:
+    if sys.argv[1:2] == ["diff"]:
+        diff_main(sys.argv[2:])
+    if sys.argv[1:2] == ["serve"]:
+        serve_main(sys.argv[2:])
+
     parser = argparse.ArgumentParser(description="Export 佛脚刷题 JSON from ULearning")
     parser.add_argument("--env", default=".env", help="Path to .env file")
     parser.add_argument(
@@ -97,18 +225,161 @@ def main() -> None:
     parser.add_argument("--output", default=None, help="Output directory")
     parser.add_argument("--raw", action="store_true", help="Also export raw API JSON")
     parser.add_argument("--txt", action="store_true", help="Also export a readable txt")
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Dry run: fetch only the answer sheet and print request counts per endpoint and the estimated run time.",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Reuse standard answers from a previous --raw export in the output directory instead of resubmitting.",
+    )
+    parser.add_argument(
+        "--connect-timeout",
+        type=float,
+        default=ULearningClient.DEFAULT_TIMEOUT[0],
+        help="Connect timeout per API request in seconds (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--read-timeout",
+        type=float,
+        default=ULearningClient.DEFAULT_TIMEOUT[1],
+        help="Read timeout per API request in seconds (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        default=None,
+        help="Total time budget in seconds. When it runs out, outstanding work is skipped, "
+        "everything collected so far is exported, and the exit code is 2.",
+    )
+    parser.add_argument(
+        "--fetch-deadline",
+        type=float,
+        default=None,
+        help="Time budget in seconds for fetching question pages (capped by --deadline).",
+    )
+    parser.add_argument(
+        "--answers-deadline",
+        type=float,
+        default=None,
+        help="Time budget in seconds for collecting standard answers (capped by --deadline).",
+    )
+    parser.add_argument(
+        "--hedge",
+        action="store_true",
+        help="Hedge slow answerSheet/questionList/training GETs: send a duplicate once a call exceeds "
+        "the adaptive latency percentile, keep the first response. Never applied to answer submission.",
+    )
+    parser.add_argument(
+        "--hedge-percentile",
+        type=float,
+        default=95.0,
+        help="Latency percentile after which a GET is hedged (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--hedge-budget",
+        type=float,
+        default=0.1,
+        help="Max extra requests from hedging, as a fraction of GETs (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--shard-size",
+        type=_positive_int,
+        default=None,
+        help="Split questions.json into shards of at most N questions (writes questions.manifest.json).",
+    )
+    parser.add_argument(
+        "--shard-by-type",
+        action="store_true",
+        help="Split questions.json into one shard set per 题型 (combinable with --shard-size).",
+    )
+    parser.add_argument(
+        "--images",
+        action="store_true",
+        help="Download images/attachments referenced by questions and reference local copies in the output.",
+    )
+    parser.add_argument(
+        "--assets-dir",
+        default=None,
+        help="Content-addressed asset store for --images (default: <output>/assets). Share it across banks to download once.",
+    )
+    parser.add_argument(
+        "--image-workers",
+        type=int,
+        default=8,
+        help="Concurrent downloads for --images (default: 8).",
+    )
+    parser.add_argument(
+        "--trace",
+        default=None,
+        metavar="TRACE_JSON",
+        help="Write a request/phase timeline in Chrome trace-event format (open in https://ui.perfetto.dev).",
+    )
+    parser.add_argument(
+        "--record",
+        default=None,
+        metavar="CASSETTE",
+        help="Record every API request/response to a cassette file (.json or .json.gz). Authorization is redacted.",
+    )
+    parser.add_argument(
+        "--replay",
+        default=None,
+        metavar="CASSETTE",
+        help="Serve API responses from a recorded cassette instead of the network.",
+    )
+    parser.add_argument(
+        "--replay-timing",
+        action="store_true",
+        help="With --replay: reproduce original response times and pacing delays.",
+    )
+    parser.add_argument(
+        "--no-probe",
+        action="store_true",
+        help="Do not probe API endpoints when BASE_URL is unset; use the domain-based guess.",
+    )
+    parser.add_argument(
+        "--reprobe",
+        action="store_true",
+        help="Ignore the cached endpoint choice and probe all API endpoints again.",
+    )
 
     args = parser.parse_args()
+    options = ExportOptions(
+        use_user_answers=args.user_answer,
+        correct_limit=args.correct_limit,
+        export_raw=args.raw,
+        export_txt=args.txt,
+        shard_size=args.shard_size,
+        shard_by_type=args.shard_by_type,
+        fetch_images=args.images,
+        assets_dir=args.assets_dir,
+        image_workers=args.image_workers,
+        fetch_deadline=args.fetch_deadline,
+        answers_deadline=args.answers_deadline,
+        resume=args.resume,
+    )
     raise SystemExit(
         run(
-            args.env,
-            args.cookie,
-            args.url,
-            args.output,
-            args.user_answer,
-            args.correct_limit,
-            args.raw,
-            args.txt,
+            options,
+            env_path=args.env,
+            cookie_file=args.cookie,
+            practice_url=args.url,
+            output_dir=args.output,
+            record_path=args.record,
+            replay_path=args.replay,
+            replay_timing=args.replay_timing,
+            connect_timeout=args.connect_timeout,
+            read_timeout=args.read_timeout,
+            deadline_seconds=args.deadline,
+            trace_path=args.trace,
+            hedge=args.hedge,
+            hedge_percentile=args.hedge_percentile,
+            hedge_budget=args.hedge_budget,
+            plan_only=args.plan,
+            probe=not args.no_probe,
+            reprobe=args.reprobe,
         )
     )
 
@@ -8,8 +8,7 @@ from pathlib import Path
 
 from .config import Config
 from .client import ULearningClient
-from .formatter import QuestionFormatter
-from .exporter import Exporter
+from .pipeline import ExportOptions, export_bank
 
 
 def main():
@@ -74,31 +73,16 @@ def main():
         print(f"  - USER_ID: {config.user_id}")
         print(f"  - Output: {config.output_dir}")
         
-        # Fetch questions
+        # Fetch, format and export through the same pipeline as main.py and the service
         client = ULearningClient(config)
-        raw_questions = client.fetch_all_questions(include_user_answers=args.user_answer)
-
-        if not args.user_answer:
-            correct_map = client.fetch_correct_answers(limit=args.correct_limit)
-            for q in raw_questions:
-                qid = q.get("id")
-                if isinstance(qid, int) and qid in correct_map:
-                    q["userAnswer"] = correct_map[qid]
-        
-        # Format to 佛脚刷题 format
-        print("Formatting questions...")
-        formatted_questions = QuestionFormatter.format_all(raw_questions)
-        print(f"Formatted {len(formatted_questions)} questions")
-        
-        # Export
-        exporter = Exporter(config.output_dir)
-        exporter.export_json(formatted_questions)
-        
-        if args.raw:
-            exporter.export_raw_json(raw_questions)
-        
-        if args.txt:
-            exporter.export_txt(formatted_questions)
+        options = ExportOptions(
+            use_user_answers=args.user_answer,
+            correct_limit=args.correct_limit,
+            export_raw=args.raw,
+            export_txt=args.txt,
+        )
+        result = export_bank(client, options)
+        print(f"Formatted {result.questions} questions")
         
         print("\nDone!")
         
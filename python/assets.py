@@ -0,0 +1,263 @@
+"""
+Download images / attachments referenced by questions into a local store
+"""
+
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import tempfile
+import threading
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+import requests
+
+from .deadline import Deadline, DeadlineExceeded
+from .tracing import Tracer
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+IMG_TAG_RE = re.compile(r"<\s*img\b[^>]*?\bsrc\s*=\s*(['\"]?)([^'\"\s>]+)\1[^>]*>", re.IGNORECASE)
+ATTACHMENT_TAG_RE = re.compile(
+    r"<\s*a\b[^>]*?\bhref\s*=\s*(['\"]?)([^'\"\s>]+\.(?:pdf|docx?|xlsx?|pptx?|zip|rar|mp3|mp4))\1[^>]*>",
+    re.IGNORECASE,
+)
+
+INDEX_FILE = "index.json"
+INDEX_LOCK_FILE = ".index.lock"
+
+# One lock per store directory, shared by every AssetStore on it in this process.
+_index_locks: dict[Path, threading.Lock] = {}
+_index_locks_guard = threading.Lock()
+
+
+@contextmanager
+def _locked_index(root: Path) -> Iterator[None]:
+    """Serialize index updates of a store across threads and processes."""
+    with _index_locks_guard:
+        lock = _index_locks.setdefault(root.resolve(), threading.Lock())
+    with lock, open(root / INDEX_LOCK_FILE, 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _question_texts(q: dict) -> list[str]:
+    """HTML fragments of a raw question that QuestionFormatter renders."""
+    texts = [q.get('title')]
+    texts += [(it or {}).get('title') for it in q.get('item') or []]
+    texts += list(q.get('userAnswer') or [])
+    return [t for t in texts if isinstance(t, str) and t]
+
+
+def collect_asset_urls(questions: list[dict], base_url: str) -> list[str]:
+    """Absolute image/attachment URLs referenced by raw questions (deduplicated, in order)."""
+    seen: dict[str, None] = {}
+    for q in questions:
+        for text in _question_texts(q):
+            for regex in (IMG_TAG_RE, ATTACHMENT_TAG_RE):
+                for m in regex.finditer(text):
+                    src = m.group(2)
+                    if not src.startswith("data:"):
+                        seen.setdefault(urllib.parse.urljoin(base_url, src), None)
+    return list(seen)
+
+
+class AssetStore:
+    """Content-addressed local store for downloaded assets.
+
+    Files are named by the SHA-256 of their content, so identical images shared by
+    several questions or banks are stored once. `index.json` maps source URLs to
+    stored files, letting later runs skip URLs that were already downloaded.
+
+    Several stores (threads or processes) may share one directory: index updates
+    are merged into the on-disk index under a file lock.
+
+    Downloads are capped by `deadline`: once it runs out no new download starts, and
+    the skipped URLs are counted in `deferred`. With `offline=True` (cassette replay)
+    nothing is downloaded; only assets already in the store are used.
+    """
+
+    def __init__(
+        self,
+        root: str | Path,
+        session: Optional[requests.Session] = None,
+        max_workers: int = 8,
+        deadline: Optional[Deadline] = None,
+        timeout: tuple[float, float] = (10.0, 30.0),
+        offline: bool = False,
+        tracer: Optional[Tracer] = None,
+    ):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.session = session or requests.Session()
+        self.max_workers = max(1, max_workers)
+        self.deadline = deadline or Deadline()
+        self.timeout = timeout
+        self.offline = offline
+        self.tracer = tracer or Tracer(enabled=False)
+        self.deferred = 0
+        self._lock = threading.Lock()
+        self._index: dict[str, str] = self._load_index()
+
+    def _load_index(self) -> dict[str, str]:
+        try:
+            with open(self.root / INDEX_FILE, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self) -> None:
+        """Merge this store's entries into the on-disk index (written atomically)."""
+        with _locked_index(self.root):
+            with self._lock:
+                index = {**self._load_index(), **self._index}
+                self._index = index
+            fd, tmp = tempfile.mkstemp(prefix=f".{INDEX_FILE}.", suffix=".tmp", dir=self.root)
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(index, f, ensure_ascii=False, indent=2)
+                os.replace(tmp, self.root / INDEX_FILE)
+            except BaseException:
+                try:
+                    os.unlink(tmp)
+                except OSError:
+                    pass
+                raise
+
+    def _cached(self, url: str) -> Optional[Path]:
+        name = self._index.get(url)
+        if name and (self.root / name).exists():
+            return self.root / name
+        return None
+
+    def _download(self, url: str) -> Path:
+        # Raises DeadlineExceeded instead of starting a download with no budget left.
+        timeout = self.deadline.timeout(*self.timeout)
+        with self.tracer.span("GET asset", cat="http", url=url) as span:
+            resp = self.session.get(url, timeout=timeout)
+            span["status"] = resp.status_code
+            span["bytes"] = len(resp.content)
+        resp.raise_for_status()
+        content = resp.content
+
+        ext = Path(urllib.parse.urlparse(url).path).suffix.lower()
+        if not ext or len(ext) > 6:
+            content_type = resp.headers.get('Content-Type', '').split(';')[0].strip()
+            ext = mimetypes.guess_extension(content_type) or ''
+
+        name = hashlib.sha256(content).hexdigest()[:32] + ext
+        path = self.root / name
+        if not path.exists():
+            tmp = path.with_name(f".{name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(content)
+            os.replace(tmp, path)
+
+        with self._lock:
+            self._index[url] = name
+        return path
+
+    def fetch_all(self, urls: list[str]) -> dict[str, Path]:
+        """Download missing URLs concurrently; returns url -> local path for every available asset."""
+        result: dict[str, Path] = {}
+        pending = []
+        for url in dict.fromkeys(urls):
+            cached = self._cached(url)
+            if cached is not None:
+                result[url] = cached
+            else:
+                pending.append(url)
+
+        if self.offline:
+            print(f"Assets: {len(result)} cached, {len(pending)} not in the store (offline, not downloaded)")
+            return result
+        print(f"Assets: {len(result)} cached, {len(pending)} to download")
+
+        def fetch(url: str) -> tuple[str, Optional[Path]]:
+            try:
+                return url, self._download(url)
+            except DeadlineExceeded:
+                pass
+            except (requests.exceptions.RequestException, OSError) as e:
+                if not self.deadline.expired:
+                    print(f"Warning: Failed to download {url}: {e}")
+                    return url, None
+            # Cut short by the deadline (not started, or timed out against the remaining budget).
+            with self._lock:
+                self.deferred += 1
+            return url, None
+
+        if pending:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="asset") as pool:
+                for url, path in pool.map(fetch, pending):
+                    if path is not None:
+                        result[url] = path
+            try:
+                self._save_index()
+            except OSError as e:
+                # The index only saves work on later runs; the downloaded files are in place.
+                print(f"Warning: Failed to update {self.root / INDEX_FILE}: {e}")
+
+        return result
+
+
+def localize_assets(
+    questions: list[dict],
+    assets: dict[str, Path],
+    output_dir: str | Path,
+    base_url: str,
+) -> list[dict]:
+    """Copy of raw questions where downloaded `<img>`/`<a>` tags become `[图片: path]` / `[附件: path]`.
+
+    Paths are relative to the output directory. Tags whose asset could not be
+    downloaded are left alone (QuestionFormatter strips them as before).
+    """
+    def local_ref(label: str, m: re.Match) -> str:
+        path = assets.get(urllib.parse.urljoin(base_url, m.group(2)))
+        if path is None:
+            return m.group(0)
+        rel = Path(os.path.relpath(path, output_dir)).as_posix()
+        return f"[{label}: {rel}]"
+
+    def rewrite(text: object) -> object:
+        if not isinstance(text, str) or '<' not in text:
+            return text
+        text = IMG_TAG_RE.sub(lambda m: local_ref("图片", m), text)
+        return ATTACHMENT_TAG_RE.sub(lambda m: local_ref("附件", m), text)
+
+    result = []
+    for q in questions:
+        q = copy.deepcopy(q)
+        if 'title' in q:
+            q['title'] = rewrite(q['title'])
+        for it in q.get('item') or []:
+            if isinstance(it, dict) and 'title' in it:
+                it['title'] = rewrite(it['title'])
+        if isinstance(q.get('userAnswer'), list):
+            q['userAnswer'] = [rewrite(a) for a in q['userAnswer']]
+        result.append(q)
+    return result
@@ -0,0 +1,139 @@
+"""
+Record / replay HTTP interactions for offline runs
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Optional
+
+import requests
+
+
+REDACTED = "<redacted>"
+
+
+class CassetteMiss(Exception):
+    """Raised in replay mode when no recorded interaction matches a request"""
+
+
+class _ReplayResponse:
+    """Minimal stand-in for `requests.Response` served from a cassette"""
+
+    def __init__(self, status: int, body: object, url: str):
+        self.status_code = status
+        self._body = body
+        self.url = url
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error (replayed) for url: {self.url}", response=self)
+
+    def json(self) -> object:
+        if isinstance(self._body, str):
+            return json.loads(self._body)
+        return self._body
+
+
+def _request_key(method: str, endpoint: str, params: dict, payload: Optional[dict]) -> str:
+    return json.dumps(
+        [method.upper(), endpoint, params or {}, payload],
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+
+
+class Cassette:
+    """A recorded sequence of API interactions.
+
+    mode="record": every response passed to `record()` is kept and written by `save()`.
+    mode="replay": `play()` serves recorded responses in order for identical requests.
+    """
+
+    def __init__(self, path: str | Path, mode: str = "record", realtime: bool = False):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = Path(path)
+        self.mode = mode
+        self.realtime = realtime
+        self.headers: dict = {}
+        self.interactions: list[dict] = []
+        self._lock = threading.Lock()
+        self._queues: dict[str, deque] = {}
+        if mode == "replay":
+            self._load()
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def _load(self) -> None:
+        opener = gzip.open if self.path.suffix == ".gz" else open
+        with opener(self.path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        self.headers = data.get("headers", {})
+        self.interactions = data.get("interactions", [])
+        for it in self.interactions:
+            key = _request_key(it["method"], it["endpoint"], it.get("params") or {}, it.get("payload"))
+            self._queues.setdefault(key, deque()).append(it)
+
+    def save(self) -> Path:
+        """Write recorded interactions (compact JSON, gzip when the path ends with .gz)."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {"version": 1, "headers": self.headers, "interactions": self.interactions}
+        opener = gzip.open if self.path.suffix == ".gz" else open
+        with opener(self.path, "wt", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        print(f"Saved {len(self.interactions)} interactions to {self.path}")
+        return self.path
+
+    def record(
+        self,
+        method: str,
+        endpoint: str,
+        params: dict,
+        payload: Optional[dict],
+        headers: dict,
+        resp: requests.Response,
+        elapsed: float,
+    ) -> None:
+        """Store one completed request/response. The Authorization header is redacted."""
+        safe_headers = {k: (REDACTED if k.lower() == "authorization" else v) for k, v in headers.items()}
+        try:
+            body: object = resp.json()
+        except ValueError:
+            body = resp.text
+        with self._lock:
+            # Session headers are the same for every request; keep a single copy.
+            self.headers = safe_headers
+            self.interactions.append({
+                "method": method.upper(),
+                "endpoint": endpoint,
+                "params": params or {},
+                "payload": payload,
+                "status": resp.status_code,
+                "body": body,
+                "elapsed": round(elapsed, 4),
+            })
+
+    def play(self, method: str, endpoint: str, params: dict, payload: Optional[dict], url: str) -> _ReplayResponse:
+        """Serve the next recorded response for an identical request."""
+        key = _request_key(method, endpoint, params or {}, payload)
+        with self._lock:
+            queue = self._queues.get(key)
+            if not queue:
+                raise CassetteMiss(f"No recorded interaction for {method.upper()} {endpoint} {params}")
+            it = queue.popleft()
+        if self.realtime and it.get("elapsed"):
+            time.sleep(it["elapsed"])
+        return _ReplayResponse(it.get("status", 200), it.get("body"), url)
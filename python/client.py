@@ -6,17 +6,51 @@ import math
 import random
 import time
 import requests
-from typing import Optional
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
 
+from .cassette import Cassette
 from .config import Config
+from .deadline import Deadline, DeadlineExceeded
+from .hedging import HedgePolicy
+from .tracing import Tracer
 
 
 class ULearningClient:
     """API client for ULearning platform"""
+
+    # Idempotent GET endpoints that may be hedged. Never add the answer POST here.
+    HEDGEABLE_ENDPOINTS = frozenset({
+        '/questionTraining/student/training',
+        '/questionTraining/student/answerSheet',
+        '/questionTraining/student/questionList',
+    })
     
-    def __init__(self, config: Config):
+    # (connect, read) seconds for every API request.
+    DEFAULT_TIMEOUT = (10.0, 30.0)
+    # Questions per questionList page (also used by the planner to count pages).
+    PAGE_SIZE = 30
+
+    def __init__(
+        self,
+        config: Config,
+        cassette: Optional[Cassette] = None,
+        timeout: tuple[float, float] = DEFAULT_TIMEOUT,
+        deadline: Optional[Deadline] = None,
+        tracer: Optional[Tracer] = None,
+        hedging: Optional[HedgePolicy] = None,
+        session: Optional[requests.Session] = None,
+    ):
         self.config = config
-        self.session = requests.Session()
+        self.hedging = hedging
+        self.cassette = cassette
+        self.tracer = tracer or Tracer(enabled=False)
+        self.timeout = timeout
+        self.deadline = deadline or Deadline(None)
+        # Set when a deadline made a fetch stop early; what was collected is still returned.
+        self.incomplete = False
+        # A shared session (connection pool) may be passed in by long-running callers.
+        self.session = session or requests.Session()
         self._setup_session()
     
     def _setup_session(self):
@@ -29,10 +63,73 @@ class ULearningClient:
             'Referer': 'https://lms.dgut.edu.cn/utest/index.html',
         })
     
+    def asset_session(self) -> requests.Session:
+        """Session for downloading images/attachments.
+
+        Same browser headers, but no Authorization: assets are often served from other hosts.
+        """
+        session = requests.Session()
+        session.headers.update({k: v for k, v in self.session.headers.items() if k.lower() != 'authorization'})
+        return session
+
+    @contextmanager
+    def _within(self, deadline: Optional[Deadline]) -> Iterator[Deadline]:
+        """Run a phase under `deadline` (requests and sleeps inside it are capped by it)."""
+        previous = self.deadline
+        if deadline is not None:
+            self.deadline = deadline
+        try:
+            yield self.deadline
+        finally:
+            self.deadline = previous
+
+    def defer(self, what: str, **args: object) -> None:
+        """Mark the run incomplete because the deadline cut `what` short (warning + trace marker)."""
+        self.incomplete = True
+        self.tracer.instant("deadline", cat="deadline", deferred=what, **args)
+        print(f"Warning: Deadline reached, {what}")
+
+    def _sleep(self, seconds: float, reason: str = "delay") -> None:
+        with self.tracer.span("sleep", cat=reason, seconds=round(seconds, 3)):
+            self.deadline.sleep(seconds)
+
+    def _send(self, method: str, endpoint: str, params: dict, payload: Optional[dict] = None):
+        """Send a request, going through the cassette when one is attached.
+
+        Idempotent GETs listed in HEDGEABLE_ENDPOINTS are hedged when a HedgePolicy is set.
+        """
+        url = f"{self.config.base_url}{endpoint}"
+        # Raises DeadlineExceeded instead of starting a request with no budget left.
+        timeout = self.deadline.timeout(*self.timeout)
+        name = endpoint.rsplit("/", 1)[-1]
+        args = {"pn": params.get("pn"), "relationId": (payload or {}).get("relationId")}
+
+        if self.cassette is not None and self.cassette.replaying:
+            with self.tracer.span(f"{method} {name}", cat="http", replay=True, **args):
+                return self.cassette.play(method, endpoint, params, payload, url)
+
+        def attempt(hedging: bool = False) -> tuple[requests.Response, float]:
+            with self.tracer.span(f"{method} {name}", cat="http", hedging=hedging or None, **args) as span:
+                start = time.perf_counter()
+                if method == "GET":
+                    resp = self.session.get(url, params=params, timeout=timeout)
+                else:
+                    resp = self.session.post(url, params=params, json=payload, timeout=timeout)
+                span["status"] = resp.status_code
+                return resp, time.perf_counter() - start
+
+        if self.hedging is not None and method == "GET" and endpoint in self.HEDGEABLE_ENDPOINTS:
+            resp, elapsed = self.hedging.run(endpoint, attempt, backup=lambda: attempt(hedging=True))
+        else:
+            resp, elapsed = attempt()
+
+        if self.cassette is not None and self.cassette.recording:
+            self.cassette.record(method, endpoint, params, payload, dict(self.session.headers), resp, elapsed)
+        return resp
+
     def _make_request(self, endpoint: str, params: dict) -> dict:
         """Make API request"""
-        url = f"{self.config.base_url}{endpoint}"
-        resp = self.session.get(url, params=params)
+        resp = self._send("GET", endpoint, params)
         resp.raise_for_status()
         data = resp.json()
         
@@ -43,8 +140,7 @@ class ULearningClient:
 
     def _make_post(self, endpoint: str, params: dict, payload: dict) -> dict:
         """Make API POST request (JSON)."""
-        url = f"{self.config.base_url}{endpoint}"
-        resp = self.session.post(url, params=params, json=payload)
+        resp = self._send("POST", endpoint, params, payload)
         resp.raise_for_status()
         data = resp.json()
         # This endpoint returns code=1 (correct) or code=2 (wrong). Both are valid for extracting correctAnswer.
@@ -72,7 +168,7 @@ class ULearningClient:
         }
         return self._make_request('/questionTraining/student/answerSheet', params)
     
-    def get_question_list(self, page: int = 1, page_size: int = 30) -> dict:
+    def get_question_list(self, page: int = 1, page_size: int = PAGE_SIZE) -> dict:
         """Get question list with details (paginated)"""
         params = {
             'qtId': self.config.qt_id,
@@ -84,58 +180,77 @@ class ULearningClient:
         }
         return self._make_request('/questionTraining/student/questionList', params)
     
-    def fetch_all_questions(self, delay: float = 0.3, include_user_answers: bool = False) -> list[dict]:
+    def fetch_all_questions(
+        self,
+        delay: float = 0.3,
+        include_user_answers: bool = False,
+        deadline: Optional[Deadline] = None,
+        progress: Optional[Callable[[str, int, int], None]] = None,
+    ) -> list[dict]:
         """Fetch all questions.
 
         NOTE:
         - `answerSheet.result.list[*].answer` is typically the user's submitted answer, not the standard answer.
         - By default we do NOT merge these user answers into the returned questions.
+        - When `deadline` (or the client deadline) runs out, remaining pages are skipped and
+          the questions fetched so far are returned.
         """
-        print("Fetching answer sheet...")
-        answer_sheet = self.get_answer_sheet()
-
-        answer_list = answer_sheet['result']['list']
-        total = answer_sheet['result']['total']
-        print(f"Total questions: {total}")
-
-        answer_map = {}
-        if include_user_answers:
-            answer_map = {
-                item['id']: {
-                    'answer': item.get('answer', []),
-                    'correct': item.get('correct'),
-                    'questionType': item.get('questionType')
+        with self._within(deadline) as dl, self.tracer.span("fetch_all_questions", cat="phase"):
+            print("Fetching answer sheet...")
+            try:
+                answer_sheet = self.get_answer_sheet()
+            except DeadlineExceeded:
+                self.defer("deferring all pages")
+                return []
+
+            answer_list = answer_sheet['result']['list']
+            total = answer_sheet['result']['total']
+            print(f"Total questions: {total}")
+
+            answer_map = {}
+            if include_user_answers:
+                answer_map = {
+                    item['id']: {
+                        'answer': item.get('answer', []),
+                        'correct': item.get('correct'),
+                        'questionType': item.get('questionType')
+                    }
+                    for item in answer_list
                 }
-                for item in answer_list
-            }
 
-        # Fetch all question details
-        all_questions = []
-        page_size = 30
-        total_pages = math.ceil(total / page_size)
+            # Fetch all question details
+            all_questions = []
+            page_size = self.PAGE_SIZE
+            total_pages = math.ceil(total / page_size)
         
-        for page in range(1, total_pages + 1):
-            print(f"Fetching page {page}/{total_pages}...")
+            for page in range(1, total_pages + 1):
+                if dl.expired:
+                    self.defer(f"deferring pages {page}-{total_pages}", pages=total_pages - page + 1)
+                    break
+                print(f"Fetching page {page}/{total_pages}...")
             
-            try:
-                result = self.get_question_list(page, page_size)
-                questions = result['result'].get('trainingQuestions', [])
+                try:
+                    result = self.get_question_list(page, page_size)
+                    questions = result['result'].get('trainingQuestions', [])
                 
-                for q in questions:
-                    q_id = q['id']
-                    if include_user_answers and q_id in answer_map:
-                        q['userAnswer'] = answer_map[q_id]['answer']
-                        q['isCorrect'] = answer_map[q_id]['correct']
-                    all_questions.append(q)
+                    for q in questions:
+                        q_id = q['id']
+                        if include_user_answers and q_id in answer_map:
+                            q['userAnswer'] = answer_map[q_id]['answer']
+                            q['isCorrect'] = answer_map[q_id]['correct']
+                        all_questions.append(q)
                     
-            except Exception as e:
-                print(f"Warning: Failed to get page {page}: {e}")
+                except Exception as e:
+                    print(f"Warning: Failed to get page {page}: {e}")
             
-            if delay > 0:
-                time.sleep(delay)
+                if progress is not None:
+                    progress("questions", page, total_pages)
+
+                if delay > 0:
+                    self._sleep(delay)
         
-        print(f"Fetched {len(all_questions)} questions")
-        return all_questions
+            print(f"Fetched {len(all_questions)} questions")
+            return all_questions
 
     def submit_answer(
         self,
@@ -187,62 +302,86 @@ class ULearningClient:
         delay: float = 0.5,
         limit: int | None = None,
         max_retries: int = 5,
+        deadline: Optional[Deadline] = None,
+        progress: Optional[Callable[[str, int, int], None]] = None,
+        known: Optional[dict[int, list[str]]] = None,
     ) -> dict[int, list[str]]:
         """Fetch standard answers by auto-submitting dummy answers.
 
         Returns a map: questionId -> correctAnswer(list[str]).
+        Questions in `known` (e.g. from a previous export) are reused without submitting.
+        When the deadline runs out, the answers collected so far are returned.
         """
-        answer_sheet = self.get_answer_sheet()
-        items = answer_sheet["result"]["list"]
-        correct_map: dict[int, list[str]] = {}
-
-        total = len(items)
-        for idx, it in enumerate(items):
-            if limit is not None and idx >= limit:
-                break
-            qid = int(it["id"])
-
-            # If already obtained, skip.
-            if qid in correct_map:
-                continue
-
-            # We need the question type to choose a valid dummy answer.
-            # Try to use answer_sheet questionType as fallback.
-            q_type = it.get("questionType")
-            q_stub = {"type": q_type}
-            dummy = self._dummy_answer_for_question(q_stub)
-
-            last_err: Exception | None = None
-            resp: dict | None = None
-            for attempt in range(max_retries):
-                try:
-                    resp = self.submit_answer(relation_id=qid, index=idx, answer=dummy)
+        with self._within(deadline) as dl, self.tracer.span("fetch_correct_answers", cat="phase"):
+            try:
+                answer_sheet = self.get_answer_sheet()
+            except DeadlineExceeded:
+                self.defer("deferring all submissions")
+                return dict(known or {})
+            items = answer_sheet["result"]["list"]
+            correct_map: dict[int, list[str]] = {}
+
+            total = len(items)
+            for idx, it in enumerate(items):
+                if limit is not None and idx >= limit:
                     break
-                except requests.exceptions.RequestException as e:
-                    last_err = e
-                    backoff = (delay * (2 ** attempt)) + random.uniform(0, max(delay, 0.1))
-                    print(f"Warning: submit_answer failed (idx={idx}, qid={qid}, attempt={attempt + 1}/{max_retries}): {e}. Sleep {backoff:.2f}s")
-                    time.sleep(backoff)
-
-            if resp is None:
-                raise Exception(f"submit_answer failed after {max_retries} retries: {last_err}")
-
-            # Some server responses use non-1/2 code to indicate auth issues.
-            if resp.get("code") == 2001:
-                raise Exception(f"API error: {resp.get('message')} (authorization/token expired?)")
-
-            result = resp.get("result") or {}
-            correct = result.get("correctAnswer")
-            if isinstance(correct, list):
-                correct_map[qid] = [str(x) for x in correct]
-            else:
-                correct_map[qid] = []
-
-            if delay > 0:
-                time.sleep(delay)
-
-            if (idx + 1) % 20 == 0:
-                print(f"Collected correct answers: {idx + 1}/{total}")
-
-        print(f"Collected correct answers for {len(correct_map)} questions")
-        return correct_map
+                if dl.expired:
+                    self.defer(f"deferring {total - idx} remaining submissions", submissions=total - idx)
+                    break
+                qid = int(it["id"])
+
+                # If already obtained, skip.
+                if qid in correct_map:
+                    continue
+                if known and qid in known:
+                    correct_map[qid] = known[qid]
+                    continue
+
+                # We need the question type to choose a valid dummy answer.
+                # Try to use answer_sheet questionType as fallback.
+                q_type = it.get("questionType")
+                q_stub = {"type": q_type}
+                dummy = self._dummy_answer_for_question(q_stub)
+
+                last_err: Exception | None = None
+                resp: dict | None = None
+                for attempt in range(max_retries):
+                    try:
+                        resp = self.submit_answer(relation_id=qid, index=idx, answer=dummy)
+                        break
+                    except DeadlineExceeded:
+                        break
+                    except requests.exceptions.RequestException as e:
+                        last_err = e
+                        backoff = (delay * (2 ** attempt)) + random.uniform(0, max(delay, 0.1))
+                        print(f"Warning: submit_answer failed (idx={idx}, qid={qid}, attempt={attempt + 1}/{max_retries}): {e}. Sleep {backoff:.2f}s")
+                        self._sleep(backoff, reason="backoff")
+
+                if resp is None and dl.expired:
+                    self.defer(f"deferring {total - idx} remaining submissions", submissions=total - idx)
+                    break
+                if resp is None:
+                    raise Exception(f"submit_answer failed after {max_retries} retries: {last_err}")
+
+                # Some server responses use non-1/2 code to indicate auth issues.
+                if resp.get("code") == 2001:
+                    raise Exception(f"API error: {resp.get('message')} (authorization/token expired?)")
+
+                result = resp.get("result") or {}
+                correct = result.get("correctAnswer")
+                if isinstance(correct, list):
+                    correct_map[qid] = [str(x) for x in correct]
+                else:
+                    correct_map[qid] = []
+
+                if progress is not None:
+                    progress("answers", idx + 1, total if limit is None else min(limit, total))
+
+                if delay > 0:
+                    self._sleep(delay)
+
+                if (idx + 1) % 20 == 0:
+                    print(f"Collected correct answers: {idx + 1}/{total}")
+
+            print(f"Collected correct answers for {len(correct_map)} questions")
+            return correct_map
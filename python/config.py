@@ -5,12 +5,19 @@ Configuration management - load settings from environment variables
 import json
 import os
 import re
+import threading
 import urllib.parse
 from dataclasses import dataclass
 from pathlib import Path
 from dotenv import load_dotenv
 
 
+DGUT_BASE_URL = "https://lms.dgut.edu.cn/utestapi"
+OFFICIAL_BASE_URL = "https://utestapi.ulearning.cn"
+# Known API deployments, probed when BASE_URL is not set explicitly.
+BASE_URL_CANDIDATES = (DGUT_BASE_URL, OFFICIAL_BASE_URL)
+
+
 @dataclass
 class Config:
     """Application configuration"""
@@ -19,8 +26,10 @@ class Config:
     qt_id: int
     oc_id: int
     qt_type: int = 1
-    base_url: str = "https://lms.dgut.edu.cn/utestapi"
+    base_url: str = DGUT_BASE_URL
     output_dir: str = "output"
+    # False when base_url was guessed from the practice URL / cookies rather than set via BASE_URL.
+    base_url_explicit: bool = True
 
     @classmethod
     def load(
@@ -61,7 +70,7 @@ class Config:
             "QT_ID": os.getenv("QT_ID") or url_values.get("QT_ID", ""),
             "OC_ID": os.getenv("OC_ID") or url_values.get("OC_ID", ""),
             "QT_TYPE": os.getenv("QT_TYPE") or url_values.get("QT_TYPE", "1"),
-            "BASE_URL": os.getenv("BASE_URL") or "https://lms.dgut.edu.cn/utestapi",
+            "BASE_URL": os.getenv("BASE_URL") or "",
             "OUTPUT_DIR": os.getenv("OUTPUT_DIR") or "output",
         }
 
@@ -92,6 +101,7 @@ class Config:
 
         # Determine base URL based on domain detection
         base_url = merged.get("BASE_URL")
+        base_url_explicit = bool(base_url)
         if not base_url:
             base_url = _detect_base_url(cookie_values, practice_url)
         
@@ -103,14 +113,25 @@ class Config:
             qt_type=int(merged.get("QT_TYPE", "1")),
             base_url=base_url,
             output_dir=merged.get("OUTPUT_DIR", "output"),
+            base_url_explicit=base_url_explicit,
         )
 
 
+# One token per match: a complete string literal (group 1, kept) or a comment (dropped).
+# Strings are matched first, so `//` inside values such as URLs is never treated as a comment.
+# Every character is consumed at most once, i.e. a single linear pass over the file.
+_JSONC_TOKEN_RE = re.compile(
+    r'("[^"\\\n]*(?:\\.[^"\\\n]*)*")'         # string literal with escapes
+    r"|//[^\n]*"                              # line comment
+    r"|/\*[^*]*(?:\*(?!/)[^*]*)*(?:\*/)?"     # block comment (unterminated runs to EOF)
+)
+
+
 def _strip_jsonc(text: str) -> str:
-    # Remove /* ... */ and // ... comments.
-    text = re.sub(r"/\*[\s\S]*?\*/", "", text)
-    text = re.sub(r"(^|\s)//.*$", r"\1", text, flags=re.MULTILINE)
-    return text
+    # Remove /* ... */ and // ... comments, leaving string contents untouched.
+    if "/" not in text:
+        return text
+    return _JSONC_TOKEN_RE.sub(r"\1", text)
 
 
 def _read_cookie_file(path: Path) -> list[dict]:
@@ -121,14 +142,38 @@ def _read_cookie_file(path: Path) -> list[dict]:
     return data
 
 
+# Only these cookies are used by Config.load; browser exports often contain hundreds.
+_WANTED_COOKIES = ("AUTHORIZATION", "token", "USERINFO", "USER_INFO")
+
+# path -> ((mtime_ns, size), extracted values); batch and server modes load the same files repeatedly.
+_cookie_cache: dict[str, tuple[tuple[int, int], dict[str, str]]] = {}
+_cookie_cache_lock = threading.Lock()
+
+
 def _extract_from_cookie_file(path: Path) -> dict[str, str]:
-    cookies = _read_cookie_file(path)
+    st = path.stat()
+    key = str(path.resolve())
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _cookie_cache_lock:
+        cached = _cookie_cache.get(key)
+    if cached is not None and cached[0] == stamp:
+        return dict(cached[1])
+
+    values = _extract_from_cookies(_read_cookie_file(path))
+    with _cookie_cache_lock:
+        _cookie_cache[key] = (stamp, values)
+    return dict(values)
+
+
+def _extract_from_cookies(cookies: list[dict]) -> dict[str, str]:
     cookie_map: dict[str, str] = {}
     for c in cookies:
-        name = str(c.get("name", ""))
-        value = str(c.get("value", ""))
-        if name:
-            cookie_map[name] = value
+        if not isinstance(c, dict):
+            continue
+        name = c.get("name")
+        # Later duplicates overwrite earlier ones, as with the full name -> value map before.
+        if name in _WANTED_COOKIES:
+            cookie_map[name] = str(c.get("value", ""))
 
     authorization = cookie_map.get("AUTHORIZATION") or cookie_map.get("token") or ""
 
@@ -175,14 +220,14 @@ def _detect_base_url(cookie_values: dict[str, str], practice_url: str | None = N
     # Check practice URL for official platform indicators
     if practice_url:
         if "ulearning.cn" in practice_url or "www.ulearning.cn" in practice_url:
-            return "https://utestapi.ulearning.cn"
+            return OFFICIAL_BASE_URL
         elif "lms.dgut.edu.cn" in practice_url:
-            return "https://lms.dgut.edu.cn/utestapi"
+            return DGUT_BASE_URL
     
     # Check cookies for domain indicators
     for cookie_name, cookie_value in cookie_values.items():
         if cookie_value and ("ulearning.cn" in cookie_value or "www.ulearning.cn" in cookie_value):
-            return "https://utestapi.ulearning.cn"
+            return OFFICIAL_BASE_URL
     
     # Default to DGUT
-    return "https://lms.dgut.edu.cn/utestapi"
+    return DGUT_BASE_URL
@@ -0,0 +1,65 @@
+"""
+Time budgets for a run and its phases
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Optional
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a request would start after its time budget ran out"""
+
+
+class Deadline:
+    """A point in time after which no new work should start.
+
+    `Deadline(None)` never expires. `phase()` derives a shorter budget that still
+    respects the parent, so a per-phase deadline can never outlive the run deadline.
+    """
+
+    def __init__(self, seconds: Optional[float] = None, _expires_at: Optional[float] = None):
+        if _expires_at is not None:
+            self.expires_at: Optional[float] = _expires_at
+        elif seconds is not None:
+            self.expires_at = time.monotonic() + seconds
+        else:
+            self.expires_at = None
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left, or None when unlimited."""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def phase(self, seconds: Optional[float]) -> "Deadline":
+        """Child deadline: `seconds` from now, capped by this deadline."""
+        if seconds is None:
+            return Deadline(_expires_at=self.expires_at)
+        expires_at = time.monotonic() + seconds
+        if self.expires_at is not None:
+            expires_at = min(expires_at, self.expires_at)
+        return Deadline(_expires_at=expires_at)
+
+    def timeout(self, connect: float, read: float) -> tuple[float, float]:
+        """Per-request (connect, read) timeouts shortened to fit the remaining budget."""
+        remaining = self.remaining()
+        if remaining is None:
+            return connect, read
+        if remaining <= 0:
+            raise DeadlineExceeded("time budget exhausted")
+        return min(connect, remaining), min(read, remaining)
+
+    def sleep(self, seconds: float) -> None:
+        """Sleep, but never past the deadline."""
+        remaining = self.remaining()
+        if remaining is not None:
+            seconds = min(seconds, remaining)
+        if seconds > 0:
+            time.sleep(seconds)
@@ -0,0 +1,181 @@
+"""
+Diff two exported question banks by content fingerprint
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .formatter import QuestionFormatter
+
+
+# Fill-blank answers are embedded in the stem as `{answer}`.
+_BLANK_ANSWER_RE = re.compile(r"\{([^{}]*)\}")
+_WS_RE = re.compile(r"\s+")
+# Option labels produced by QuestionFormatter._format_choice, e.g. "A. xxx".
+_OPTION_LABEL_RE = re.compile(r"^\s*[A-Z0-9]+\.\s*")
+
+
+def _digest(*parts: str) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for p in parts:
+        h.update(p.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def _normalize(text: object) -> str:
+    s = "" if text is None else str(text)
+    # Exports are already cleaned by the formatter; only re-run it on leftover markup.
+    if "<" in s or "&" in s:
+        s = QuestionFormatter._strip_html(s)
+    return _WS_RE.sub(" ", s).strip()
+
+
+def _stem_and_blanks(q: dict) -> tuple[str, list[str]]:
+    stem = str(q.get("题干", ""))
+    if q.get("题型") != "填空题":
+        return _normalize(stem), []
+    blanks = [_normalize(m) for m in _BLANK_ANSWER_RE.findall(stem)]
+    return _normalize(_BLANK_ANSWER_RE.sub("{}", stem)), blanks
+
+
+def _options(q: dict) -> list[str]:
+    return [_normalize(_OPTION_LABEL_RE.sub("", str(o))) for o in q.get("选项") or []]
+
+
+def _answer(q: dict, sep: str = "\x1f") -> str:
+    # The control-character separator keeps hashes unambiguous; reports pass a readable one.
+    if q.get("题型") == "填空题":
+        return sep.join(_stem_and_blanks(q)[1])
+    return _normalize(q.get("答案", ""))
+
+
+def question_key(q: dict) -> str:
+    """Identity of a formatted question: type + normalized stem (without blank answers)."""
+    stem, _ = _stem_and_blanks(q)
+    return _digest(str(q.get("题型", "")), stem)
+
+
+def question_fingerprint(q: dict, key: str | None = None) -> str:
+    """Content hash of a formatted question: identity + options + answer."""
+    return _digest(key or question_key(q), "\x1e".join(_options(q)), _answer(q))
+
+
+@dataclass
+class BankDiff:
+    """Result of comparing two question banks"""
+    added: list[dict] = field(default_factory=list)
+    removed: list[dict] = field(default_factory=list)
+    changed_answer: list[tuple[dict, dict]] = field(default_factory=list)
+    changed_options: list[tuple[dict, dict]] = field(default_factory=list)
+    unchanged: int = 0
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.added or self.removed or self.changed_answer or self.changed_options)
+
+    def to_dict(self) -> dict:
+        def pair(old: dict, new: dict) -> dict:
+            return {"old": old, "new": new}
+
+        return {
+            "summary": {
+                "added": len(self.added),
+                "removed": len(self.removed),
+                "changed_answer": len(self.changed_answer),
+                "changed_options": len(self.changed_options),
+                "unchanged": self.unchanged,
+            },
+            "added": self.added,
+            "removed": self.removed,
+            "changed_answer": [pair(o, n) for o, n in self.changed_answer],
+            "changed_options": [pair(o, n) for o, n in self.changed_options],
+        }
+
+    def to_text(self) -> str:
+        lines = [
+            f"+ added: {len(self.added)}  - removed: {len(self.removed)}  "
+            f"~ answer: {len(self.changed_answer)}  ~ options: {len(self.changed_options)}  "
+            f"= unchanged: {self.unchanged}",
+            "",
+        ]
+        for q in self.added:
+            lines.append(f"+ [{q.get('题型', '')}] {_normalize(q.get('题干', ''))}")
+        for q in self.removed:
+            lines.append(f"- [{q.get('题型', '')}] {_normalize(q.get('题干', ''))}")
+        for old, new in self.changed_answer:
+            lines.append(f"~ [{new.get('题型', '')}] {_normalize(new.get('题干', ''))}")
+            lines.append(f"    答案: {_answer(old, ' | ')!r} -> {_answer(new, ' | ')!r}")
+        for old, new in self.changed_options:
+            lines.append(f"~ [{new.get('题型', '')}] {_normalize(new.get('题干', ''))}")
+            lines.append(f"    选项: {old.get('选项', [])} -> {new.get('选项', [])}")
+        return "\n".join(lines).rstrip() + "\n"
+
+
+def _index(questions: list[dict]) -> dict[str, list[tuple[str, dict]]]:
+    # A bank may contain the same stem more than once; keep every occurrence in order.
+    index: dict[str, list[tuple[str, dict]]] = {}
+    for q in questions:
+        key = question_key(q)
+        index.setdefault(key, []).append((question_fingerprint(q, key), q))
+    return index
+
+
+def diff_banks(old: list[dict], new: list[dict]) -> BankDiff:
+    """Compare two formatted banks in O(n) using hash indexes on both sides."""
+    result = BankDiff()
+    old_index = _index(old)
+    new_index = _index(new)
+
+    for key, new_items in new_index.items():
+        old_items = old_index.get(key, [])
+        for i, (new_fp, nq) in enumerate(new_items):
+            if i >= len(old_items):
+                result.added.append(nq)
+                continue
+            old_fp, oq = old_items[i]
+            if old_fp == new_fp:
+                result.unchanged += 1
+                continue
+            # Options and answer are reported independently; a question may appear in both lists.
+            if _options(oq) != _options(nq):
+                result.changed_options.append((oq, nq))
+            if _answer(oq) != _answer(nq):
+                result.changed_answer.append((oq, nq))
+        result.removed.extend(q for _, q in old_items[len(new_items):])
+
+    for key, old_items in old_index.items():
+        if key not in new_index:
+            result.removed.extend(q for _, q in old_items)
+
+    return result
+
+
+def load_bank(path: str | Path) -> list[dict]:
+    """Load an exported bank; raw API exports are formatted first.
+
+    A sharded export can be loaded through its `*.manifest.json`.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict) and "shards" in data:
+        data = _load_shards(Path(path).parent, data)
+    if not isinstance(data, list):
+        raise ValueError(f"{path}: expected a JSON array of questions")
+    if data and isinstance(data[0], dict) and "题型" not in data[0]:
+        data = QuestionFormatter.format_all(data)
+    return data
+
+
+def _load_shards(base: Path, manifest: dict) -> list[dict]:
+    ordered: dict[int, dict] = {}
+    for entry in manifest["shards"]:
+        with open(base / entry["file"], "r", encoding="utf-8") as f:
+            questions = json.load(f)
+        ordered.update(zip(entry.get("indices") or range(len(ordered), len(ordered) + len(questions)), questions))
+    return [ordered[i] for i in sorted(ordered)]
@@ -3,54 +3,199 @@ Export questions to various formats
 """
 
 import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Callable, IO, Optional
+
+from .tracing import Tracer
+
+
+# mkstemp creates files as 0600; new exports get the usual mode instead.
+# (Reading the umask would mean setting it, which races with other threads.)
+DEFAULT_FILE_MODE = 0o644
 
 
 class Exporter:
-    """Export questions to files"""
-    
-    def __init__(self, output_dir: str = "output"):
+    """Export questions to files
+
+    Every file is written atomically (temp file in the same directory + rename),
+    so readers never see a half-written export.
+
+    Sharding (`shard_size` and/or `shard_by_type`) replaces the single JSON file
+    with several shard files plus a `<name>.manifest.json` describing them. Files of
+    the other mode left by a previous run are removed after a successful write.
+    """
+
+    def __init__(
+        self,
+        output_dir: str = "output",
+        shard_size: Optional[int] = None,
+        shard_by_type: bool = False,
+        max_workers: int = 4,
+        tracer: Optional[Tracer] = None,
+    ):
+        if shard_size is not None and shard_size <= 0:
+            raise ValueError("shard_size must be a positive integer")
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
-    
+        self.shard_size = shard_size
+        self.shard_by_type = shard_by_type
+        self.max_workers = max(1, max_workers)
+        self.tracer = tracer or Tracer(enabled=False)
+
+    @property
+    def sharded(self) -> bool:
+        return self.shard_size is not None or self.shard_by_type
+
+    def _atomic_write(self, output_path: Path, write: Callable[[IO[str]], None]) -> Path:
+        """Write through a temp file in the target directory, then rename over the target."""
+        fd, tmp = tempfile.mkstemp(prefix=f".{output_path.name}.", suffix=".tmp", dir=output_path.parent)
+        try:
+            with self.tracer.span("write", cat="export", file=output_path.name):
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    write(f)
+                try:
+                    mode = os.stat(output_path).st_mode & 0o777
+                except FileNotFoundError:
+                    mode = DEFAULT_FILE_MODE
+                os.chmod(tmp, mode)
+                os.replace(tmp, output_path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        return output_path
+
+    def _write_json(self, output_path: Path, data: object) -> Path:
+        return self._atomic_write(output_path, lambda f: json.dump(data, f, ensure_ascii=False, indent=2))
+
     def export_json(self, questions: list[dict], filename: str = "questions.json") -> Path:
-        """Export to JSON file (佛脚刷题 format)"""
-        output_path = self.output_dir / filename
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(questions, f, ensure_ascii=False, indent=2)
+        """Export to JSON file (佛脚刷题 format)
+
+        Returns the manifest path instead when sharding is enabled.
+        """
+        if self.sharded:
+            return self.export_shards(questions, filename)
+        output_path = self._write_json(self.output_dir / filename, questions)
+        # A previous sharded run would otherwise leave an outdated manifest for `diff`.
+        manifest_path = self.output_dir / f"{Path(filename).stem}.manifest.json"
+        if manifest_path.exists():
+            self._remove_shards(self._read_manifest(manifest_path))
+            manifest_path.unlink(missing_ok=True)
         print(f"Exported to {output_path}")
         return output_path
-    
+
+    def _plan_shards(self, questions: list[dict], stem: str) -> list[dict]:
+        groups: dict[str, list[tuple[int, dict]]] = {}
+        for i, q in enumerate(questions):
+            key = str(q.get('题型', '未知')) if self.shard_by_type else ''
+            groups.setdefault(key, []).append((i, q))
+
+        shards = []
+        for q_type, items in groups.items():
+            size = self.shard_size or len(items)
+            for n, start in enumerate(range(0, len(items), size), 1):
+                chunk = items[start:start + size]
+                name = '-'.join(p for p in (stem, q_type, f"{n:03d}") if p)
+                shards.append({
+                    "file": f"{name}.json",
+                    "type": q_type or None,
+                    "count": len(chunk),
+                    "indices": [i for i, _ in chunk],
+                    "questions": [q for _, q in chunk],
+                })
+        return shards
+
+    def export_shards(self, questions: list[dict], filename: str = "questions.json") -> Path:
+        """Export JSON split into shards (by max size and/or 题型), written in parallel, plus a manifest."""
+        stem = Path(filename).stem
+        manifest_path = self.output_dir / f"{stem}.manifest.json"
+        previous = self._read_manifest(manifest_path)
+
+        shards = self._plan_shards(questions, stem)
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="export-shard") as pool:
+            list(pool.map(lambda s: self._write_json(self.output_dir / s["file"], s["questions"]), shards))
+
+        manifest = {
+            "total": len(questions),
+            "shard_size": self.shard_size,
+            "shard_by_type": self.shard_by_type,
+            "shards": [{k: v for k, v in s.items() if k != "questions"} for s in shards],
+        }
+        self._write_json(manifest_path, manifest)
+
+        # Drop shards of a previous run that are no longer part of the manifest,
+        # and the single file of a previous unsharded run.
+        self._remove_shards(previous, keep={s["file"] for s in shards})
+        (self.output_dir / filename).unlink(missing_ok=True)
+
+        print(f"Exported {len(shards)} shards to {self.output_dir} (manifest: {manifest_path})")
+        return manifest_path
+
+    def _remove_shards(self, manifest: dict, keep: Optional[set[str]] = None) -> None:
+        keep = keep or set()
+        for entry in manifest.get("shards", []):
+            name = entry.get("file") if isinstance(entry, dict) else None
+            # Only plain file names inside the output directory; a manifest is not trusted further.
+            if isinstance(name, str) and name not in keep and Path(name).name == name:
+                (self.output_dir / name).unlink(missing_ok=True)
+
+    @staticmethod
+    def _read_manifest(path: Path) -> dict:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
     def export_raw_json(self, questions: list[dict], filename: str = "questions_raw.json") -> Path:
         """Export raw API response to JSON file"""
-        output_path = self.output_dir / filename
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(questions, f, ensure_ascii=False, indent=2)
+        output_path = self._write_json(self.output_dir / filename, questions)
         print(f"Exported raw data to {output_path}")
         return output_path
-    
+
     def export_txt(self, questions: list[dict], filename: str = "questions.txt") -> Path:
         """Export to readable text file"""
-        output_path = self.output_dir / filename
-        
-        with open(output_path, 'w', encoding='utf-8') as f:
+        def write(f: IO[str]) -> None:
             for i, q in enumerate(questions, 1):
                 f.write(f"=== 第{i}题 ({q.get('题型', '未知')}) ===\n")
                 f.write(f"题干: {q.get('题干', '')}\n")
-                
+
                 if '选项' in q:
                     f.write("选项:\n")
                     for opt in q['选项']:
                         f.write(f"  {opt}\n")
-                
+
                 if '答案' in q:
                     f.write(f"答案: {q['答案']}\n")
-                
+
                 if q.get('解析'):
                     f.write(f"解析: {q['解析']}\n")
-                
+
                 f.write("\n")
-        
+
+        output_path = self._atomic_write(self.output_dir / filename, write)
         print(f"Exported text to {output_path}")
         return output_path
+
+    def export_all(
+        self,
+        questions: list[dict],
+        raw_questions: Optional[list[dict]] = None,
+        txt: bool = False,
+    ) -> list[Path]:
+        """Write every requested target (json, raw, txt) concurrently."""
+        jobs: list[Callable[[], Path]] = [lambda: self.export_json(questions)]
+        if raw_questions is not None:
+            jobs.append(lambda: self.export_raw_json(raw_questions))
+        if txt:
+            jobs.append(lambda: self.export_txt(questions))
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(jobs)), thread_name_prefix="export") as pool:
+            futures = [pool.submit(job) for job in jobs]
+            return [f.result() for f in futures]
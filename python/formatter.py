@@ -2,6 +2,7 @@
 Question formatter - convert to 佛脚刷题 JSON format
 """
 
+from functools import lru_cache
 from typing import Optional
 import html
 import re
@@ -169,21 +170,8 @@ class QuestionFormatter:
         s = '' if text is None else str(text)
         if not s:
             return ''
-        # Normalize common line break tags to newlines
-        s = re.sub(r"<\s*br\s*/?\s*>", "\n", s, flags=re.IGNORECASE)
-        # End of common blocks -> newline
-        s = re.sub(r"<\s*/\s*(p|div|li|tr)\s*>", "\n", s, flags=re.IGNORECASE)
-        # Remove all remaining tags
-        s = re.sub(r"<[^>]+>", "", s)
-        # Decode HTML entities (&nbsp; etc.) - call twice for double-encoded entities
-        s = html.unescape(html.unescape(s))
-        # Normalize line endings and excessive spaces per line
-        s = s.replace("\r\n", "\n").replace("\r", "\n")
-        s = re.sub(r"[\t\f\v]+", " ", s)
-        s = re.sub(r"[ \u00a0]+", " ", s)
-        s = re.sub(r"\n{3,}", "\n\n", s)
-        return s
-    
+        return _strip_html_cached(s)
+
     @classmethod
     def format_all(cls, questions: list[dict]) -> list[dict]:
         """Format all questions to 佛脚刷题 format"""
@@ -193,3 +181,23 @@ class QuestionFormatter:
             if formatted:
                 result.append(formatted)
         return result
+
+
+# Banks are re-exported often and options like 正确/错误 repeat across questions;
+# cache cleaned fragments so repeated exports in one process skip the regex passes.
+@lru_cache(maxsize=65536)
+def _strip_html_cached(s: str) -> str:
+    # Normalize common line break tags to newlines
+    s = re.sub(r"<\s*br\s*/?\s*>", "\n", s, flags=re.IGNORECASE)
+    # End of common blocks -> newline
+    s = re.sub(r"<\s*/\s*(p|div|li|tr)\s*>", "\n", s, flags=re.IGNORECASE)
+    # Remove all remaining tags
+    s = re.sub(r"<[^>]+>", "", s)
+    # Decode HTML entities (&nbsp; etc.) - call twice for double-encoded entities
+    s = html.unescape(html.unescape(s))
+    # Normalize line endings and excessive spaces per line
+    s = s.replace("\r\n", "\n").replace("\r", "\n")
+    s = re.sub(r"[\t\f\v]+", " ", s)
+    s = re.sub(r"[ \u00a0]+", " ", s)
+    s = re.sub(r"\n{3,}", "\n\n", s)
+    return s
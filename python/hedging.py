@@ -0,0 +1,137 @@
+"""
+Hedged requests: duplicate a slow idempotent call and keep the first answer
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, TimeoutError, wait
+from typing import Callable, Optional, TypeVar
+
+
+T = TypeVar("T")
+
+
+class HedgePolicy:
+    """Adaptive hedging for idempotent requests.
+
+    If a call has not finished after the `percentile` latency observed for the same
+    key (e.g. endpoint), a duplicate is started and whichever succeeds first wins.
+    Hedges are limited to `budget` (fraction of all calls, plus `burst`), so a slow
+    server never sees more than that much extra load.
+
+    Only use this for idempotent requests: both copies may reach the server.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95.0,
+        initial_delay: float = 1.0,
+        min_delay: float = 0.05,
+        max_delay: float = 10.0,
+        budget: float = 0.1,
+        burst: int = 2,
+        min_samples: int = 10,
+        window: int = 200,
+        max_workers: int = 8,
+    ):
+        if not 0 < percentile < 100:
+            raise ValueError("percentile must be between 0 and 100")
+        if budget < 0:
+            raise ValueError("budget must not be negative")
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self.burst = burst
+        self.min_samples = min_samples
+        self.window = window
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._samples: dict[str, deque] = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+
+    def threshold(self, key: str) -> float:
+        """Seconds to wait before hedging a call for `key`."""
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < self.min_samples:
+            return self.initial_delay
+        idx = min(len(samples) - 1, int(len(samples) * self.percentile / 100))
+        return min(self.max_delay, max(self.min_delay, samples[idx]))
+
+    def _observe(self, key: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def _take_hedge(self) -> bool:
+        with self._lock:
+            if self.hedges >= self.budget * self.calls + self.burst:
+                return False
+            self.hedges += 1
+            return True
+
+    def _observe_late(self, key: str, fut: Future) -> None:
+        # The tail is what sets the threshold: count slow losers once they finish.
+        if not fut.cancelled() and fut.exception() is None:
+            self._observe(key, fut.result()[1])
+
+    def run(
+        self,
+        key: str,
+        call: Callable[[], tuple[T, float]],
+        backup: Optional[Callable[[], tuple[T, float]]] = None,
+    ) -> tuple[T, float]:
+        """Run `call` (returning (result, elapsed_seconds)) with hedging.
+
+        `backup` is used for the duplicate (defaults to `call`), e.g. to tag it in traces.
+        """
+        with self._lock:
+            self.calls += 1
+
+        primary = self._pool.submit(call)
+        try:
+            result = primary.result(timeout=self.threshold(key))
+            self._observe(key, result[1])
+            return result
+        except TimeoutError:
+            pass
+
+        if not self._take_hedge():
+            result = primary.result()
+            self._observe(key, result[1])
+            return result
+
+        hedge = self._pool.submit(backup or call)
+        pending: set[Future] = {primary, hedge}
+        first_error: BaseException | None = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                if fut.exception() is not None:
+                    first_error = first_error or fut.exception()
+                    continue
+                # The loser cannot be interrupted mid-request; its result is discarded,
+                # but its latency still feeds the percentile.
+                for other in (pending | done) - {fut}:
+                    if not other.cancel():
+                        other.add_done_callback(lambda f: self._observe_late(key, f))
+                result = fut.result()
+                self._observe(key, result[1])
+                if fut is hedge:
+                    with self._lock:
+                        self.hedge_wins += 1
+                return result
+        assert first_error is not None
+        raise first_error
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"calls": self.calls, "hedges": self.hedges, "hedge_wins": self.hedge_wins}
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
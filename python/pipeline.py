@@ -0,0 +1,171 @@
+"""
+Export pipeline: fetch -> (answers) -> (assets) -> format -> write
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Optional
+
+from .assets import AssetStore, collect_asset_urls, localize_assets
+from .client import ULearningClient
+from .exporter import Exporter
+from .formatter import QuestionFormatter
+
+
+# progress(stage, done, total)
+ProgressCallback = Callable[[str, int, int], None]
+
+
+@dataclass
+class ExportOptions:
+    """What to export and how; shared by the CLI and the export service"""
+    use_user_answers: bool = False
+    correct_limit: Optional[int] = None
+    export_raw: bool = False
+    export_txt: bool = False
+    shard_size: Optional[int] = None
+    shard_by_type: bool = False
+    fetch_images: bool = False
+    assets_dir: Optional[str] = None
+    image_workers: int = 8
+    fetch_deadline: Optional[float] = None
+    answers_deadline: Optional[float] = None
+    fetch_delay: float = 0.3
+    answer_delay: float = 0.5
+    resume: bool = False
+
+    def validate(self) -> None:
+        """Raise ValueError for settings that would only fail after network work (e.g. from a JSON job)."""
+        for name in ("use_user_answers", "export_raw", "export_txt", "shard_by_type", "fetch_images", "resume"):
+            if not isinstance(getattr(self, name), bool):
+                raise ValueError(f"{name} must be a boolean")
+        for name, minimum in (("correct_limit", 0), ("shard_size", 1), ("image_workers", 1)):
+            value = getattr(self, name)
+            if value is None and name != "image_workers":
+                continue
+            if not isinstance(value, int) or isinstance(value, bool) or value < minimum:
+                raise ValueError(f"{name} must be an integer >= {minimum}")
+        for name in ("fetch_deadline", "answers_deadline", "fetch_delay", "answer_delay"):
+            value = getattr(self, name)
+            if value is None and name.endswith("_deadline"):
+                continue
+            if not isinstance(value, (int, float)) or isinstance(value, bool) or value < 0:
+                raise ValueError(f"{name} must be a non-negative number")
+        if self.assets_dir is not None and not isinstance(self.assets_dir, str):
+            raise ValueError("assets_dir must be a string")
+
+
+def previous_answers(output_dir: str | Path, filename: str = "questions_raw.json") -> dict[int, list[str]]:
+    """Standard answers from a previous `--raw` export in `output_dir`.
+
+    Questions exported with `--user-answer` carry `isCorrect` and hold the user's own
+    answers, so they are not reused.
+    """
+    try:
+        with open(Path(output_dir) / filename, "r", encoding="utf-8") as f:
+            questions = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    known: dict[int, list[str]] = {}
+    for q in questions if isinstance(questions, list) else []:
+        answer = q.get("userAnswer")
+        if isinstance(q.get("id"), int) and "isCorrect" not in q and isinstance(answer, list) and answer:
+            known[q["id"]] = [str(a) for a in answer]
+    return known
+
+
+@dataclass
+class ExportResult:
+    """Outcome of one export"""
+    files: list[Path] = field(default_factory=list)
+    questions: int = 0
+    incomplete: bool = False
+
+
+def export_bank(
+    client: ULearningClient,
+    options: ExportOptions,
+    progress: Optional[ProgressCallback] = None,
+) -> ExportResult:
+    """Run a full export with `client` into `client.config.output_dir`."""
+    config = client.config
+    deadline = client.deadline
+    tracer = client.tracer
+    # Built first so invalid export settings fail before any request is sent or answer submitted.
+    exporter = Exporter(
+        config.output_dir,
+        shard_size=options.shard_size,
+        shard_by_type=options.shard_by_type,
+        tracer=tracer,
+    )
+
+    # Default: export standard answers (correctAnswer) by calling submit_answer.
+    # Legacy mode (--user-answer): export user's submitted answers (answerSheet.answer) without submitting.
+    raw_questions = client.fetch_all_questions(
+        delay=options.fetch_delay,
+        include_user_answers=options.use_user_answers,
+        deadline=deadline.phase(options.fetch_deadline),
+        progress=progress,
+    )
+
+    if not options.use_user_answers:
+        # Collect standard answers by auto-submitting dummy answers.
+        # NOTE: this will write answer records to the training.
+        known = previous_answers(config.output_dir) if options.resume else None
+        if known:
+            print(f"Reusing {len(known)} standard answers from the previous export")
+        if deadline.expired:
+            # Budget spent while fetching: export the questions without submitting anything.
+            client.defer("skipping standard answers")
+            correct_map = known or {}
+        else:
+            correct_map = client.fetch_correct_answers(
+                delay=options.answer_delay,
+                limit=options.correct_limit,
+                deadline=deadline.phase(options.answers_deadline),
+                progress=progress,
+                known=known,
+            )
+        for q in raw_questions:
+            qid = q.get("id")
+            if isinstance(qid, int) and qid in correct_map:
+                q["userAnswer"] = correct_map[qid]
+
+    questions_to_format = raw_questions
+    if options.fetch_images and deadline.expired:
+        client.defer("skipping image download")
+    elif options.fetch_images:
+        # Download referenced images/attachments and point the exported text at local copies.
+        with tracer.span("images", cat="phase"):
+            store = AssetStore(
+                options.assets_dir or Path(config.output_dir) / "assets",
+                session=client.asset_session(),
+                max_workers=options.image_workers,
+                deadline=deadline,
+                timeout=client.timeout,
+                # Replays must not touch the network; use whatever the store already holds.
+                offline=client.cassette is not None and client.cassette.replaying,
+                tracer=tracer,
+            )
+            urls = collect_asset_urls(raw_questions, config.base_url)
+            assets = store.fetch_all(urls)
+            if store.deferred:
+                client.defer(f"deferring {store.deferred} asset downloads", assets=store.deferred)
+            questions_to_format = localize_assets(raw_questions, assets, config.output_dir, config.base_url)
+
+    with tracer.span("format", cat="phase", questions=len(questions_to_format)):
+        formatted_questions = QuestionFormatter.format_all(questions_to_format)
+
+    with tracer.span("export", cat="phase"):
+        files = exporter.export_all(
+            formatted_questions,
+            raw_questions=raw_questions if options.export_raw else None,
+            txt=options.export_txt,
+        )
+    if progress is not None:
+        progress("export", len(files), len(files))
+
+    return ExportResult(files=files, questions=len(formatted_questions), incomplete=client.incomplete)
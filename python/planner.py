@@ -0,0 +1,125 @@
+"""
+Dry-run planner: predict requests and wall-clock time of an export
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from .assets import INDEX_FILE, collect_asset_urls
+from .client import ULearningClient
+from .pipeline import ExportOptions, previous_answers
+
+
+@dataclass
+class ExportPlan:
+    """Predicted cost of an export, computed from one answerSheet request"""
+    total_questions: int
+    requests: dict[str, int] = field(default_factory=dict)
+    submissions: int = 0
+    skipped_submissions: int = 0
+    asset_downloads: Optional[int] = None
+    request_latency: float = 0.0
+    pacing_seconds: float = 0.0
+    estimated_seconds: float = 0.0
+    deadline: Optional[float] = None
+    notes: list[str] = field(default_factory=list)
+
+    def to_text(self) -> str:
+        lines = [f"Questions: {self.total_questions}", "Requests:"]
+        for name, count in self.requests.items():
+            lines.append(f"  {name:<12} {count}")
+        lines.append(f"  {'total':<12} {sum(self.requests.values())}")
+        if self.submissions or self.skipped_submissions:
+            lines.append(f"Submissions: {self.submissions} (skipped via previous export: {self.skipped_submissions})")
+        if self.asset_downloads is not None:
+            lines.append(f"Asset downloads (not yet in store): {self.asset_downloads}")
+        lines.append(f"Measured request latency: {self.request_latency * 1000:.0f} ms")
+        lines.append(f"Mandatory sleeps: {self.pacing_seconds:.1f} s")
+        lines.append(f"Estimated wall-clock time: {_format_duration(self.estimated_seconds)}")
+        if self.deadline is not None:
+            fits = "fits" if self.estimated_seconds <= self.deadline else "does NOT fit"
+            lines.append(f"Deadline: {_format_duration(self.deadline)} ({fits})")
+        for note in self.notes:
+            lines.append(f"Note: {note}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_duration(seconds: float) -> str:
+    minutes, secs = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m{secs:02d}s" if hours else f"{minutes}m{secs:02d}s"
+
+
+def _pending_assets(options: ExportOptions, output_dir: str, base_url: str) -> Optional[int]:
+    """Asset URLs from the previous raw export that the asset store does not have yet."""
+    try:
+        with open(Path(output_dir) / "questions_raw.json", "r", encoding="utf-8") as f:
+            questions = json.load(f)
+    except (OSError, ValueError):
+        return None
+    store = Path(options.assets_dir or Path(output_dir) / "assets")
+    try:
+        with open(store / INDEX_FILE, "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = {}
+    urls = collect_asset_urls(questions, base_url)
+    return sum(1 for url in urls if not (url in index and (store / index[url]).exists()))
+
+
+def plan_export(client: ULearningClient, options: ExportOptions, deadline: Optional[float] = None) -> ExportPlan:
+    """Fetch only the answer sheet and predict what `export_bank` would do with `options`."""
+    config = client.config
+    start = time.perf_counter()
+    answer_sheet = client.get_answer_sheet()
+    latency = time.perf_counter() - start
+
+    items = answer_sheet["result"]["list"]
+    total = answer_sheet["result"]["total"]
+    pages = math.ceil(total / client.PAGE_SIZE)
+
+    plan = ExportPlan(total_questions=total, request_latency=latency, deadline=deadline)
+    plan.requests["answerSheet"] = 1
+    plan.requests["questionList"] = pages
+    pacing = pages * options.fetch_delay
+
+    if not options.use_user_answers:
+        # fetch_correct_answers reads the answer sheet again before submitting.
+        plan.requests["answerSheet"] += 1
+        ids = [int(it["id"]) for it in items]
+        if options.correct_limit is not None:
+            ids = ids[:options.correct_limit]
+        known = previous_answers(config.output_dir) if options.resume else {}
+        plan.skipped_submissions = sum(1 for qid in ids if qid in known)
+        plan.submissions = len(ids) - plan.skipped_submissions
+        plan.requests["answer"] = plan.submissions
+        pacing += plan.submissions * options.answer_delay
+        if not options.resume and previous_answers(config.output_dir):
+            plan.notes.append("a previous raw export exists; --resume would skip already answered questions")
+
+    if options.fetch_images:
+        plan.asset_downloads = _pending_assets(options, config.output_dir, config.base_url)
+        if plan.asset_downloads is None:
+            plan.notes.append("image count unknown until questions are fetched (no previous raw export)")
+
+    # Requests are sequential; the answer sheet is the largest response, so its latency is a safe upper bound.
+    requests_total = sum(plan.requests.values())
+    plan.pacing_seconds = pacing
+    plan.estimated_seconds = requests_total * latency + pacing
+    if plan.asset_downloads:
+        plan.estimated_seconds += math.ceil(plan.asset_downloads / max(1, options.image_workers)) * latency
+    if client.hedging is not None:
+        plan.notes.append(
+            f"hedging may add up to {client.hedging.budget:.0%} extra GETs (not counted) and trims slow pages"
+        )
+    if deadline is not None and plan.estimated_seconds > deadline and plan.submissions:
+        per_submission = latency + options.answer_delay
+        over = plan.estimated_seconds - deadline
+        plan.notes.append(f"about {min(plan.submissions, math.ceil(over / per_submission))} submissions would be deferred")
+    return plan
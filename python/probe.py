@@ -0,0 +1,131 @@
+"""
+Base-URL probing: pick the API deployment that actually serves this user
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import json
+import os
+import tempfile
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Sequence
+
+from .client import ULearningClient
+from .config import BASE_URL_CANDIDATES, Config
+
+
+DEFAULT_CACHE_PATH = Path(".cache") / "base_url.json"
+# A deployment rarely moves; re-probe once a week in case it does.
+CACHE_TTL = 7 * 24 * 3600.0
+PROBE_TIMEOUT = (3.0, 5.0)
+
+_cache_lock = threading.Lock()
+
+
+@dataclass
+class ProbeResult:
+    """Outcome of probing one candidate base URL"""
+    base_url: str
+    ok: bool
+    latency: float
+    error: Optional[str] = None
+
+
+def probe_base_urls(
+    config: Config,
+    candidates: Sequence[str] = BASE_URL_CANDIDATES,
+    timeout: tuple[float, float] = PROBE_TIMEOUT,
+) -> list[ProbeResult]:
+    """Call the training endpoint on every candidate at once; fastest valid answer first."""
+
+    def probe(base_url: str) -> ProbeResult:
+        client = ULearningClient(dataclasses.replace(config, base_url=base_url), timeout=timeout)
+        start = time.perf_counter()
+        try:
+            client.get_training_info()
+            return ProbeResult(base_url, True, time.perf_counter() - start)
+        except Exception as e:
+            return ProbeResult(base_url, False, time.perf_counter() - start, str(e))
+        finally:
+            client.session.close()
+
+    with ThreadPoolExecutor(max_workers=max(1, len(candidates)), thread_name_prefix="probe") as pool:
+        results = list(pool.map(probe, candidates))
+    return sorted(results, key=lambda r: (not r.ok, r.latency))
+
+
+def tenant_key(config: Config, practice_url: Optional[str] = None) -> str:
+    """Cache key: the practice page's domain, else the user id."""
+    host = urllib.parse.urlsplit(practice_url).hostname if practice_url else None
+    return host or f"user:{config.user_id}"
+
+
+def _read_cache(path: Path) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_cache(path: Path, data: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def resolve_base_url(
+    config: Config,
+    practice_url: Optional[str] = None,
+    cache_path: str | Path = DEFAULT_CACHE_PATH,
+    refresh: bool = False,
+    candidates: Sequence[str] = BASE_URL_CANDIDATES,
+) -> str:
+    """Base URL for `config`: cached choice for this tenant, else one parallel probe round.
+
+    An explicit BASE_URL is returned unchanged. If no candidate answers, the guess
+    from `Config.load` is kept and nothing is cached.
+    """
+    if config.base_url_explicit:
+        return config.base_url
+    path = Path(cache_path)
+    key = tenant_key(config, practice_url)
+    if not refresh:
+        with _cache_lock:
+            entry = _read_cache(path).get(key)
+        if (
+            isinstance(entry, dict)
+            and entry.get("base_url") in candidates
+            and time.time() - float(entry.get("checked_at", 0)) < CACHE_TTL
+        ):
+            return entry["base_url"]
+
+    results = probe_base_urls(config, candidates)
+    best = results[0]
+    if not best.ok:
+        errors = "; ".join(f"{r.base_url}: {r.error}" for r in results)
+        print(f"Warning: no API endpoint answered ({errors}); using {config.base_url}")
+        return config.base_url
+
+    print(f"Using API endpoint {best.base_url} ({best.latency * 1000:.0f} ms)")
+    with _cache_lock:
+        data = _read_cache(path)
+        data[key] = {"base_url": best.base_url, "latency": round(best.latency, 4), "checked_at": time.time()}
+        _write_cache(path, data)
+    return best.base_url
@@ -0,0 +1,243 @@
+"""
+Export-as-a-service: a local HTTP server that queues export jobs
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+import traceback
+import urllib.parse
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, fields
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+
+import requests
+
+from .client import ULearningClient
+from .config import Config
+from .deadline import Deadline
+from .pipeline import ExportOptions, export_bank
+from .probe import resolve_base_url
+
+
+@dataclass
+class Job:
+    """One queued export"""
+    id: str
+    practice_url: str
+    cookie: str
+    options: ExportOptions
+    deadline: Optional[float] = None
+    status: str = "queued"  # queued -> running -> done | partial | failed
+    progress: dict = field(default_factory=dict)
+    output_dir: Optional[Path] = None
+    questions: int = 0
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    def to_dict(self) -> dict:
+        files = []
+        if self.output_dir is not None and self.status in ("done", "partial"):
+            files = sorted(p.name for p in self.output_dir.iterdir() if p.is_file() and not p.name.startswith("."))
+        return {
+            "id": self.id,
+            "status": self.status,
+            "practice_url": self.practice_url,
+            "progress": self.progress,
+            "questions": self.questions,
+            "files": files,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class ExportService:
+    """Queue of export jobs run on a bounded worker pool.
+
+    Everything that is expensive to set up is created once and shared by jobs:
+    HTTP sessions (connection pools) per base URL + Authorization, the loaded
+    .env, and the formatter's HTML cache (module level).
+    """
+
+    # Options a job may set; everything else stays at the service defaults.
+    JOB_OPTIONS = {f.name for f in fields(ExportOptions)} - {"assets_dir", "fetch_delay", "answer_delay"}
+
+    def __init__(
+        self,
+        output_root: str | Path = "output/jobs",
+        credentials_dir: str | Path = ".",
+        env_file: str = ".env",
+        max_workers: int = 2,
+        assets_dir: Optional[str] = None,
+    ):
+        self.output_root = Path(output_root)
+        self.output_root.mkdir(parents=True, exist_ok=True)
+        self.credentials_dir = Path(credentials_dir).resolve()
+        self.env_file = env_file
+        self.assets_dir = assets_dir
+        self.jobs: dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._sessions: dict[tuple[str, str], requests.Session] = {}
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="export-job")
+
+    def _resolve_cookie(self, cookie: object) -> str:
+        # Jobs reference credentials by name; never let them read files outside credentials_dir.
+        # Required: without it Config.load would fall back to the operator's COOKIE_FILE / cookie.json.
+        if not cookie or not isinstance(cookie, str):
+            raise ValueError("cookie is required (a file name in the credentials directory)")
+        path = (self.credentials_dir / cookie).resolve()
+        if self.credentials_dir not in path.parents or not path.is_file():
+            raise ValueError(f"Unknown credentials reference: {cookie}")
+        return str(path)
+
+    def _session_for(self, config: Config) -> requests.Session:
+        key = (config.base_url, config.authorization)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = self._sessions[key] = requests.Session()
+            return session
+
+    def submit(self, payload: dict) -> Job:
+        practice_url = payload.get("url")
+        if not practice_url or not isinstance(practice_url, str):
+            raise ValueError("url is required")
+        cookie = payload.get("cookie")
+        self._resolve_cookie(cookie)
+
+        raw_options = payload.get("options") or {}
+        if not isinstance(raw_options, dict):
+            raise ValueError("options must be a JSON object")
+        unknown = set(raw_options) - self.JOB_OPTIONS
+        if unknown:
+            raise ValueError(f"Unknown options: {', '.join(sorted(unknown))}")
+        options = ExportOptions(**raw_options, assets_dir=self.assets_dir)
+        options.validate()
+
+        job = Job(
+            id=uuid.uuid4().hex[:12],
+            practice_url=practice_url,
+            cookie=cookie,
+            options=options,
+            deadline=float(payload["deadline"]) if payload.get("deadline") is not None else None,
+        )
+        with self._lock:
+            self.jobs[job.id] = job
+        self._pool.submit(self._run, job)
+        return job
+
+    def _run(self, job: Job) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+
+        def progress(stage: str, done: int, total: int) -> None:
+            job.progress[stage] = {"done": done, "total": total}
+
+        try:
+            config = Config.load(
+                env_file=self.env_file,
+                cookie_file=self._resolve_cookie(job.cookie),
+                practice_url=job.practice_url,
+            )
+            # Probe results are cached per tenant, so only the first job of a tenant pays for it.
+            config.base_url = resolve_base_url(config, job.practice_url)
+            job.output_dir = self.output_root / job.id
+            config.output_dir = str(job.output_dir)
+            client = ULearningClient(
+                config,
+                deadline=Deadline(job.deadline),
+                session=self._session_for(config),
+            )
+            result = export_bank(client, job.options, progress=progress)
+            job.questions = result.questions
+            job.status = "partial" if result.incomplete else "done"
+        except Exception as e:
+            traceback.print_exc()
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def list(self) -> list[Job]:
+        with self._lock:
+            return list(self.jobs.values())
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    service: ExportService
+
+    def _send_json(self, status: int, data: object) -> None:
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        parts = [urllib.parse.unquote(p) for p in self.path.split("?", 1)[0].split("/") if p]
+        if parts == ["jobs"]:
+            return self._send_json(200, [j.to_dict() for j in self.service.list()])
+        if len(parts) >= 2 and parts[0] == "jobs":
+            job = self.service.get(parts[1])
+            if job is None:
+                return self._send_json(404, {"error": "job not found"})
+            if len(parts) == 2:
+                return self._send_json(200, job.to_dict())
+            if len(parts) == 4 and parts[2] == "files":
+                return self._send_file(job, parts[3])
+        self._send_json(404, {"error": "not found"})
+
+    def _send_file(self, job: Job, name: str) -> None:
+        if name not in job.to_dict()["files"]:
+            return self._send_json(404, {"error": "file not found"})
+        data = (job.output_dir / name).read_bytes()
+        content_type = "application/json" if name.endswith(".json") else "text/plain"
+        self.send_response(200)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self) -> None:
+        if self.path.rstrip("/") != "/jobs":
+            return self._send_json(404, {"error": "not found"})
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(payload, dict):
+                raise ValueError("request body must be a JSON object")
+            job = self.service.submit(payload)
+        except (ValueError, TypeError) as e:
+            return self._send_json(400, {"error": str(e)})
+        self._send_json(202, job.to_dict())
+
+
+def serve(service: ExportService, host: str = "127.0.0.1", port: int = 8765) -> None:
+    """Serve the job API until interrupted."""
+    handler = type("ExportHandler", (_Handler,), {"service": service})
+    httpd = ThreadingHTTPServer((host, port), handler)
+    print(f"Export service listening on http://{host}:{port} (POST /jobs, GET /jobs/<id>)")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        service.shutdown()
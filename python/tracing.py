@@ -0,0 +1,83 @@
+"""
+Timeline tracing in Chrome trace-event format (viewable in Perfetto / chrome://tracing)
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+
+class Tracer:
+    """Collect complete ("X") spans with thread ids.
+
+    A disabled tracer records nothing, so callers can always wrap work in `span()`.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.events: list[dict] = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._t0 = time.perf_counter()
+        self._named_threads: set[int] = set()
+
+    def _now_us(self) -> float:
+        return (time.perf_counter() - self._t0) * 1_000_000
+
+    def _add(self, event: dict) -> None:
+        tid = threading.get_native_id()
+        event.update(pid=self._pid, tid=tid)
+        with self._lock:
+            if tid not in self._named_threads:
+                self._named_threads.add(tid)
+                self.events.append({
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": self._pid,
+                    "tid": tid,
+                    "args": {"name": threading.current_thread().name},
+                })
+            self.events.append(event)
+
+    @contextmanager
+    def span(self, name: str, cat: str = "", **args: object) -> Iterator[dict]:
+        """Record the duration of the enclosed block. Extra args can be added to the yielded dict."""
+        if not self.enabled:
+            yield args
+            return
+        start = self._now_us()
+        try:
+            yield args
+        except BaseException as e:
+            args["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self._add({
+                "name": name,
+                "cat": cat,
+                "ph": "X",
+                "ts": round(start, 1),
+                "dur": round(self._now_us() - start, 1),
+                "args": {k: v for k, v in args.items() if v is not None},
+            })
+
+    def instant(self, name: str, cat: str = "", **args: object) -> None:
+        """Record a point-in-time event."""
+        if self.enabled:
+            self._add({"name": name, "cat": cat, "ph": "i", "s": "t", "ts": round(self._now_us(), 1), "args": args})
+
+    def save(self, path: str | Path) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            data = {"traceEvents": list(self.events), "displayTimeUnit": "ms"}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, default=str)
+        print(f"Saved trace ({len(data['traceEvents'])} events) to {path}")
+        return path